@@ -61,7 +61,7 @@ def check_directories():
 
 def check_python_packages():
     """Check if required Python packages are available"""
-    required_packages = ['beets', 'mutagen', 'watchdog', 'yaml', 'requests']
+    required_packages = ['beets', 'mutagen', 'tinytag', 'watchdog', 'yaml', 'requests']
     missing_packages = []
     
     for package in required_packages:
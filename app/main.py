@@ -7,18 +7,149 @@ Workflow: Input (Author/Book/*.mp3) -> Beets Tagging -> FFmpeg M4B -> Output (Au
 
 import os
 import sys
+import signal
+import copy
+import fcntl
 import time
+import io
 import json
 import logging
 import subprocess
 import re
+import sqlite3
+import tempfile
+import threading
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import yaml
 import shutil
+from beets.library import Library as BeetsLibrary
 from mutagen import File
 from mutagen.id3 import ID3, TALB, TIT2, TPE1, TDRC
+from tinytag import TinyTag, TinyTagException
+
+# ioctl request for reflinking a whole file (Linux FICLONE, not exported by every Python)
+FICLONE = getattr(fcntl, 'FICLONE', 0x40049409)
+
+# Metadata cache tables: tags of a book's first file and audio stream info per file
+CACHE_TABLES = ('meta_cache', 'stream_cache')
+
+# Cover image preference by file stem or suffix, lower is better
+COVER_RANKS = {'cover': 0, 'folder': 1, '.jpg': 2, '.png': 3}
+
+# Characters removed from file names, and whitespace runs collapsed to one space
+_BAD_CHARS = str.maketrans('', '', '<>:"/\\|?*')
+_WHITESPACE = re.compile(r'\s+')
+
+# Audio file extensions recognised as audiobook tracks (lowercase, without dot)
+AUDIO_EXTENSIONS = {'mp3', 'm4a'}
+
+def is_audio_file(name):
+    """Check the extension of a file name against AUDIO_EXTENSIONS"""
+    return name.rpartition('.')[2].lower() in AUDIO_EXTENSIONS
+
+def _read_id3_header(path):
+    """
+    Parse the ID3v2 tag of an MP3 file by reading only the tag block at its start
+    Returns None if the file has no ID3v2 tag
+    """
+    with open(path, 'rb') as fh:
+        header = fh.read(10)
+        if len(header) < 10 or header[:3] != b'ID3':
+            return None
+        # Tag size is a 28-bit syncsafe integer excluding the 10-byte header
+        size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        data = fh.read(size)
+    return ID3(fileobj=io.BytesIO(header + data))
+
+def _merge_config(defaults, overrides):
+    """Recursively merge user config values over a copy of the defaults"""
+    merged = copy.deepcopy(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def _start_streamed(cmd, tail_lines=200):
+    """
+    Start a command whose stderr is drained by a background thread into a bounded tail buffer
+    Undecodable bytes (e.g. non-UTF-8 file names) are replaced so the reader never dies mid-run
+    Returns (process, reader, tail) for _wait_streamed
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, bufsize=1, text=True, errors='replace')
+    tail = deque(maxlen=tail_lines)
+    
+    def drain():
+        for line in process.stderr:
+            tail.append(line.rstrip('\n'))
+    
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    return process, reader, tail
+
+def _wait_streamed(process, reader, tail, timeout):
+    """
+    Wait for a command started with _start_streamed
+    Returns (returncode, stderr_tail); raises subprocess.TimeoutExpired after killing the process
+    """
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        reader.join()
+        process.stderr.close()
+    return process.returncode, '\n'.join(tail)
+
+def _run_streamed(cmd, timeout, tail_lines=200):
+    """
+    Run a command, keeping only the last tail_lines lines of its stderr in memory
+    Returns (returncode, stderr_tail); raises subprocess.TimeoutExpired after killing the process
+    """
+    return _wait_streamed(*_start_streamed(cmd, tail_lines), timeout)
+
+def _clone_file(src, dst):
+    """
+    Make dst an independent copy of src without copying data where the filesystem allows it
+    Tries a copy-on-write reflink (FICLONE), then falls back to a regular copy. Hardlinks are
+    not used: beets rewrites tags in place, which would also retag the source file
+    """
+    try:
+        with open(src, 'rb') as src_fh, open(dst, 'wb') as dst_fh:
+            fcntl.ioctl(dst_fh.fileno(), FICLONE, src_fh.fileno())
+        return
+    except OSError:
+        # Cross-device or no reflink support on this filesystem
+        pass
+    
+    shutil.copyfile(src, dst)
+
+def _stage_workspace(src, dst):
+    """Recreate the directory tree of src at dst, cloning every file with _clone_file"""
+    os.makedirs(dst)
+    with os.scandir(src) as entries:
+        for entry in entries:
+            target = os.path.join(dst, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                _stage_workspace(entry.path, target)
+            else:
+                _clone_file(entry.path, target)
+
+def _remove_prefixed(path):
+    """Delete path and every sibling file whose name starts with its name"""
+    with os.scandir(path.parent) as entries:
+        for entry in entries:
+            if entry.name.startswith(path.name) and entry.is_file(follow_symlinks=False):
+                Path(entry.path).unlink(missing_ok=True)
 
 class AudiobookConverter:
     def __init__(self, config_path="/config/converter.yaml"):
@@ -33,6 +164,34 @@ class AudiobookConverter:
         for directory in [self.input_dir, self.output_dir, self.temp_dir]:
             directory.mkdir(parents=True, exist_ok=True)
         
+        # Scratch dirs left behind by workers killed mid-book in a previous run
+        for work_dir in self.temp_dir.glob('book_*'):
+            if work_dir.is_dir():
+                shutil.rmtree(work_dir, ignore_errors=True)
+        
+        # Persistent metadata cache keyed on (path, mtime, size) of the first audio file
+        self.meta_cache_path = self.temp_dir / 'meta_cache.sqlite'
+        self.init_metadata_cache()
+        
+        # Beets config is the same for every book, write it once
+        self._beets_config_path = self.temp_dir / 'beets_base.yaml'
+        self.write_beets_config()
+        
+        # Books are independent, so convert them in parallel worker processes
+        self.executor = ProcessPoolExecutor(max_workers=self.config['performance']['parallel_books'])
+    
+    def __getstate__(self):
+        """Drop the process pool and logger when sending the converter to a worker"""
+        state = self.__dict__.copy()
+        state.pop('executor', None)
+        state.pop('logger', None)
+        return state
+    
+    def __setstate__(self, state):
+        """Re-acquire the logger inside the worker process"""
+        self.__dict__.update(state)
+        self.logger = logging.getLogger(__name__)
+        
     def load_config(self, config_path):
         """Load configuration from YAML file with defaults"""
         default_config = {
@@ -54,6 +213,13 @@ class AudiobookConverter:
                 'tag_before_conversion': True,  # Tag individual tracks before M4B merge
                 'fetch_art': True
             },
+            'performance': {
+                'parallel_books': 1,  # Books converted simultaneously
+                'use_tmpfs': False    # Keep scratch databases on /dev/shm
+            },
+            'monitoring': {
+                'settle_time': 2  # Quiet seconds before a watched book is processed
+            },
             'output_structure': {
                 'pattern': 'author/book/file',  # author/book/file.m4b
                 'sanitize_names': True,
@@ -67,16 +233,9 @@ class AudiobookConverter:
         
         try:
             with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
+                config = yaml.safe_load(f) or {}
                 # Merge with defaults recursively
-                for key, value in default_config.items():
-                    if key not in config:
-                        config[key] = value
-                    elif isinstance(value, dict):
-                        for subkey, subvalue in value.items():
-                            if subkey not in config[key]:
-                                config[key][subkey] = subvalue
-                return config
+                return _merge_config(default_config, config)
         except FileNotFoundError:
             # Create default config
             os.makedirs(os.path.dirname(config_path), exist_ok=True)
@@ -107,8 +266,8 @@ class AudiobookConverter:
             return filename
             
         # Remove/replace problematic characters
-        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-        filename = re.sub(r'\s+', ' ', filename).strip()
+        filename = filename.translate(_BAD_CHARS)
+        filename = _WHITESPACE.sub(' ', filename).strip()
         
         # Limit length
         max_length = self.config['output_structure']['max_filename_length']
@@ -122,10 +281,16 @@ class AudiobookConverter:
         Detect if input is already in Author/Book structure or flat structure
         Returns: ('structured', author, book) or ('flat', None, book_name)
         """
+        return self._structure(str(self.input_dir), str(input_path))
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _structure(input_dir, input_path):
+        """Cached implementation of detect_input_structure, keyed on path strings"""
         input_path = Path(input_path)
         
         # Check if input path looks like Author/Book/files structure
-        if input_path.parent != self.input_dir:
+        if input_path.parent != Path(input_dir):
             # This is a nested structure: input_dir/Author/Book
             author = input_path.parent.name
             book = input_path.name
@@ -135,40 +300,141 @@ class AudiobookConverter:
             book = input_path.name
             return ('flat', None, book)
     
+    def init_metadata_cache(self):
+        """Create the metadata and stream info cache tables if they do not exist yet"""
+        with closing(sqlite3.connect(self.meta_cache_path, timeout=30)) as conn, conn:
+            for table in CACHE_TABLES:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    "(path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, meta JSON)"
+                )
+    
+    def get_cached_metadata(self, audio_file, file_stat, table='meta_cache'):
+        """Return cached metadata for an audio file if it is unchanged since it was parsed"""
+        try:
+            with closing(sqlite3.connect(self.meta_cache_path, timeout=30)) as conn:
+                row = conn.execute(
+                    f"SELECT meta FROM {table} WHERE path = ? AND mtime_ns = ? AND size = ?",
+                    (str(audio_file), file_stat.st_mtime_ns, file_stat.st_size)
+                ).fetchone()
+            return json.loads(row[0]) if row else None
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not read metadata cache: {e}")
+            return None
+    
+    def store_cached_metadata(self, audio_file, file_stat, metadata, table='meta_cache'):
+        """Store parsed metadata for an audio file in the cache"""
+        try:
+            with closing(sqlite3.connect(self.meta_cache_path, timeout=30)) as conn, conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {table} (path, mtime_ns, size, meta) VALUES (?, ?, ?, ?)",
+                    (str(audio_file), file_stat.st_mtime_ns, file_stat.st_size, json.dumps(metadata))
+                )
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not write metadata cache: {e}")
+    
+    def prune_metadata_cache(self):
+        """Remove cache entries whose audio files no longer exist"""
+        try:
+            removed = 0
+            with closing(sqlite3.connect(self.meta_cache_path, timeout=30)) as conn, conn:
+                for table in CACHE_TABLES:
+                    paths = [row[0] for row in conn.execute(f"SELECT path FROM {table}")]
+                    stale = [(path,) for path in paths if not os.path.exists(path)]
+                    conn.executemany(f"DELETE FROM {table} WHERE path = ?", stale)
+                    removed += len(stale)
+            if removed:
+                self.logger.info(f"Removed {removed} stale metadata cache entries")
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not prune metadata cache: {e}")
+    
+    def forget_cached_metadata(self, book_path):
+        """Remove cache entries for the files of a book whose input was removed"""
+        prefix = os.path.join(str(book_path), '')
+        try:
+            with closing(sqlite3.connect(self.meta_cache_path, timeout=30)) as conn, conn:
+                for table in CACHE_TABLES:
+                    conn.execute(f"DELETE FROM {table} WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not update metadata cache: {e}")
+    
+    def find_audio_files(self, book_path):
+        """List audio files directly inside a book directory, sorted by name"""
+        with os.scandir(book_path) as entries:
+            return sorted(Path(entry.path) for entry in entries
+                          if entry.is_file() and is_audio_file(entry.name))
+    
+    def read_tags(self, audio_path):
+        """
+        Read (title, artist, album, year) tags from an audio file
+        TinyTag is used first since it never loads embedded cover art into memory, and
+        with duration=False it stops at the tag instead of reading audio frames
+        Returns None if the file cannot be read
+        """
+        try:
+            tag = TinyTag.get(str(audio_path), image=False, duration=False)
+            return (tag.title or tag.album, tag.artist, tag.album,
+                    str(tag.year) if tag.year else None)
+        except TinyTagException:
+            pass
+        
+        # Fall back to mutagen for formats TinyTag cannot parse, reading just the
+        # ID3v2 block when there is one instead of letting mutagen open the whole file
+        tags = _read_id3_header(audio_path)
+        if tags is None:
+            audio_file = File(str(audio_path))
+            if audio_file is None:
+                return None
+            tags = getattr(audio_file, 'tags', None)
+        
+        title = None
+        artist = None
+        album = None
+        year = None
+        
+        if tags:
+            # Try different tag formats
+            if hasattr(tags, 'get'):
+                # ID3v2 format
+                title = str(tags.get('TIT2', [''])[0]) or str(tags.get('TALB', [''])[0])
+                artist = str(tags.get('TPE1', [''])[0])
+                album = str(tags.get('TALB', [''])[0])
+                year_tag = tags.get('TDRC', [''])
+                year = str(year_tag[0]) if year_tag else None
+            else:
+                # Alternative tag access
+                title = str(tags.get('title', [''])[0] or tags.get('album', [''])[0])
+                artist = str(tags.get('artist', [''])[0])
+                album = str(tags.get('album', [''])[0])
+                year = str(tags.get('date', [''])[0])
+        
+        return title, artist, album, year
+    
     def extract_metadata_from_files(self, book_path):
         """Extract metadata from MP3 files in the directory"""
-        audio_files = sorted(list(book_path.glob("*.mp3")) + list(book_path.glob("*.m4a")))
+        audio_files = self.find_audio_files(book_path)
         
         if not audio_files:
             return None
+        
+        # Skip parsing when the first file is unchanged since it was last read.
+        # Staged copies in the temp dir live only seconds, so they are never cached
+        cacheable = self.temp_dir not in audio_files[0].parents
+        if cacheable:
+            file_stat = audio_files[0].stat()
+            cached_metadata = self.get_cached_metadata(audio_files[0], file_stat)
+            if cached_metadata:
+                return cached_metadata
+        
+        # Folder structure used as fallback for missing tags
+        structure_info = self.detect_input_structure(book_path)
             
         # Try to get metadata from first file
         try:
-            audio_file = File(str(audio_files[0]))
-            if audio_file is None:
+            tags = self.read_tags(audio_files[0])
+            if tags is None:
                 return None
-                
-            # Extract metadata from tags
-            title = None
-            artist = None
-            album = None
-            year = None
-            
-            if hasattr(audio_file, 'tags') and audio_file.tags:
-                # Try different tag formats
-                if hasattr(audio_file.tags, 'get'):
-                    # ID3v2 format
-                    title = str(audio_file.tags.get('TIT2', [''])[0]) or str(audio_file.tags.get('TALB', [''])[0])
-                    artist = str(audio_file.tags.get('TPE1', [''])[0])
-                    album = str(audio_file.tags.get('TALB', [''])[0])
-                    year_tag = audio_file.tags.get('TDRC', [''])
-                    year = str(year_tag[0]) if year_tag else None
-                else:
-                    # Alternative tag access
-                    title = str(audio_file.tags.get('title', [''])[0] or audio_file.tags.get('album', [''])[0])
-                    artist = str(audio_file.tags.get('artist', [''])[0])
-                    album = str(audio_file.tags.get('album', [''])[0])
-                    year = str(audio_file.tags.get('date', [''])[0])
+            title, artist, album, year = tags
             
             # Clean empty strings
             title = title.strip() if title else None
@@ -177,7 +443,6 @@ class AudiobookConverter:
             year = year.strip() if year else None
             
             # Fallback to folder structure
-            structure_info = self.detect_input_structure(book_path)
             if structure_info[0] == 'structured':
                 # Use folder structure as fallback
                 if not artist:
@@ -199,18 +464,20 @@ class AudiobookConverter:
             if not album:
                 album = title
                 
-            return {
+            metadata = {
                 'title': title,
                 'artist': artist,
                 'album': album,
                 'year': year
             }
+            if cacheable:
+                self.store_cached_metadata(audio_files[0], file_stat, metadata)
+            return metadata
             
         except Exception as e:
             self.logger.warning(f"Could not extract metadata from {audio_files[0]}: {e}")
             
             # Fallback to folder structure
-            structure_info = self.detect_input_structure(book_path)
             if structure_info[0] == 'structured':
                 return {
                     'title': structure_info[2],
@@ -238,27 +505,50 @@ class AudiobookConverter:
         
         return book_dir, f"{book}.m4b"
     
+    def _scan_dir(self, path, depth):
+        """
+        Walk a directory tree reading each directory exactly once with os.scandir
+        Yields (path, has_audio) for path and every directory up to depth levels below it
+        
+        DirEntry.is_dir()/is_file() answer from the d_type returned by getdents, so
+        no per-entry stat is issued on local filesystems and there is nothing left
+        to batch asynchronously (e.g. via io_uring)
+        """
+        subdirs = []
+        has_audio = False
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                elif not has_audio and entry.is_file() and is_audio_file(entry.name):
+                    has_audio = True
+        
+        yield Path(path), has_audio
+        
+        if depth > 0:
+            for subdir in subdirs:
+                yield from self._scan_dir(subdir, depth - 1)
+    
     def scan_for_books(self):
         """Scan input directory for new audiobooks (supports both flat and Author/Book structure)"""
         self.logger.info("Scanning for audiobooks...")
+        book_paths = []
+        
+        # Flat structure (input_dir/Book/) and nested structure (input_dir/Author/Book/)
+        for book_path, has_audio in self._scan_dir(self.input_dir, 2):
+            if not has_audio or book_path == self.input_dir:
+                continue
+            if book_path.parent == self.input_dir:
+                self.logger.info(f"Found audiobook: {book_path.name}")
+            else:
+                self.logger.info(f"Found structured audiobook: {book_path.parent.name}/{book_path.name}")
+            book_paths.append(book_path)
         
-        # Scan for flat structure (input_dir/Book/)
-        for item in self.input_dir.iterdir():
-            if item.is_dir():
-                audio_files = list(item.glob("*.mp3")) + list(item.glob("*.m4a"))
-                if audio_files:
-                    self.logger.info(f"Found audiobook: {item.name}")
-                    self.process_audiobook(item)
-        
-        # Scan for nested structure (input_dir/Author/Book/)
-        for author_dir in self.input_dir.iterdir():
-            if author_dir.is_dir():
-                for book_dir in author_dir.iterdir():
-                    if book_dir.is_dir():
-                        audio_files = list(book_dir.glob("*.mp3")) + list(book_dir.glob("*.m4a"))
-                        if audio_files:
-                            self.logger.info(f"Found structured audiobook: {author_dir.name}/{book_dir.name}")
-                            self.process_audiobook(book_dir)
+        # Process all found books in parallel and wait for them to finish
+        list(self.executor.map(self.process_audiobook, book_paths))
+        
+        # Forget metadata of books that were converted or removed
+        self.prune_metadata_cache()
     
     def process_audiobook(self, book_path):
         """
@@ -284,51 +574,52 @@ class AudiobookConverter:
             if final_m4b_path.exists():
                 self.logger.info(f"M4B already exists, skipping: {final_m4b_path}")
                 shutil.rmtree(book_path)  # Clean up input
+                self.forget_cached_metadata(book_path)
                 return
             
-            # Step 3: Copy to temp directory for processing
-            temp_book_path = self.temp_dir / f"processing_{book_path.name}"
-            if temp_book_path.exists():
-                shutil.rmtree(temp_book_path)
-            
-            shutil.copytree(book_path, temp_book_path)
-            
-            # Step 4: Use beets for metadata tagging BEFORE M4B conversion
-            enhanced_metadata = metadata
-            if self.config['beets']['enable_audible'] and self.config['beets']['tag_before_conversion']:
-                enhanced_metadata = self.tag_with_beets(temp_book_path, metadata)
-            
-            # Step 5: Convert to M4B using FFmpeg 7.1.2
-            temp_m4b_file = self.convert_to_m4b_ffmpeg712(temp_book_path, enhanced_metadata, m4b_filename)
-            
-            # Step 6: Move to final destination
-            if temp_m4b_file and temp_m4b_file.exists():
-                shutil.move(temp_m4b_file, final_m4b_path)
-                self.logger.info(f"Conversion complete: {final_m4b_path}")
+            # Step 3: Stage a copy in temp only when beets will rewrite tags;
+            # FFmpeg just reads the files, so otherwise convert straight from the input.
+            # Every book gets its own scratch directory so parallel workers never share files
+            work_dir = Path(tempfile.mkdtemp(prefix='book_', dir=self.temp_dir))
+            try:
+                tag_before_conversion = self.config['beets']['enable_audible'] and self.config['beets']['tag_before_conversion']
+                if tag_before_conversion:
+                    temp_book_path = work_dir / book_path.name
+                    _stage_workspace(book_path, temp_book_path)
+                else:
+                    temp_book_path = book_path
                 
-                # Clean up
-                shutil.rmtree(book_path)  # Remove original
-                shutil.rmtree(temp_book_path)  # Remove temp
+                # Step 4: Use beets for metadata tagging BEFORE M4B conversion
+                enhanced_metadata = metadata
+                if tag_before_conversion:
+                    enhanced_metadata = self.tag_with_beets(temp_book_path, metadata)
                 
-                # Log final structure
-                self.logger.info(f"Created: {enhanced_metadata['artist']}/{enhanced_metadata.get('album', enhanced_metadata['title'])}/{m4b_filename}")
-            else:
-                self.logger.error(f"Conversion failed for {book_path}")
+                # Step 5: Convert to M4B using FFmpeg 7.1.2
+                temp_m4b_file = self.convert_to_m4b_ffmpeg712(temp_book_path, enhanced_metadata, m4b_filename, work_dir)
+                
+                # Step 6: Move to final destination
+                if temp_m4b_file and temp_m4b_file.exists():
+                    shutil.move(temp_m4b_file, final_m4b_path)
+                    self.logger.info(f"Conversion complete: {final_m4b_path}")
+                    
+                    # Clean up
+                    shutil.rmtree(book_path)  # Remove original
+                    self.forget_cached_metadata(book_path)
+                    
+                    # Log final structure
+                    self.logger.info(f"Created: {enhanced_metadata['artist']}/{enhanced_metadata.get('album', enhanced_metadata['title'])}/{m4b_filename}")
+                else:
+                    self.logger.error(f"Conversion failed for {book_path}")
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)  # Remove temp
             
         except Exception as e:
             self.logger.error(f"Error processing {book_path}: {str(e)}")
     
-    def tag_with_beets(self, book_path, initial_metadata):
-        """
-        Use beets to tag individual audio files with Audible metadata BEFORE M4B conversion
-        This allows beets to properly identify albums with multiple tracks
-        """
-        self.logger.info(f"Tagging individual tracks with beets: {book_path.name}")
-        
-        # Create temporary beets config
+    def write_beets_config(self):
+        """Write the beets config shared by all books; the library is passed per book on the command line"""
         beets_config = {
-            'directory': str(book_path.parent),
-            'library': str(self.temp_dir / f'beets_{book_path.name}.db'),
+            'directory': str(self.temp_dir),
             'plugins': ['audible'],
             'audible': {
                 'source_weight': 0.8,
@@ -350,24 +641,66 @@ class AudiobookConverter:
             }
         }
         
-        config_file = self.temp_dir / f'beets_config_{book_path.name}.yaml'
-        with open(config_file, 'w') as f:
+        with open(self._beets_config_path, 'w') as f:
             yaml.dump(beets_config, f)
+    
+    def read_beets_metadata(self, db_file, initial_metadata):
+        """Read the album beets imported from its library, or None if nothing was matched"""
+        try:
+            library = BeetsLibrary(str(db_file))
+            try:
+                album = next(iter(library.albums()), None)
+            finally:
+                # Release the SQLite connection so the unlinked database is really freed
+                library._close()
+        except Exception as e:
+            self.logger.warning(f"Could not read beets library: {e}")
+            return None
         
-        # Run beets import on individual tracks
+        if album is None or not album.album:
+            return None
+        
+        return {
+            'title': album.album,
+            'artist': album.albumartist or initial_metadata['artist'],
+            'album': album.album,
+            'year': str(album.year) if album.year else None
+        }
+    
+    def tag_with_beets(self, book_path, initial_metadata):
+        """
+        Use beets to tag individual audio files with Audible metadata BEFORE M4B conversion
+        This allows beets to properly identify albums with multiple tracks
+        """
+        self.logger.info(f"Tagging individual tracks with beets: {book_path.name}")
+        
+        # Shared config from startup; only the per-book library differs. The library is
+        # throwaway scratch, so keep it on tmpfs when enabled to avoid disk writes
+        db_name = f'beets_{os.getpid()}_{book_path.name}.db'
+        if self.config['performance']['use_tmpfs'] and os.path.ismount('/dev/shm'):
+            db_file = Path('/dev/shm') / db_name
+        else:
+            db_file = self.temp_dir / db_name
+        # PIDs repeat across restarts and a killed worker never reaches the cleanup below,
+        # so start from an empty library rather than importing into a stale one
+        _remove_prefixed(db_file)
         cmd = [
-            'beet', '-c', str(config_file), 'import', '-q', str(book_path)
+            'beet', '-c', self._beets_config_path,
+            '--library', db_file,
+            'import', '-q', book_path
         ]
         
         try:
-            self.logger.info(f"Running beets command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            self.logger.info(f"Running beets command: {' '.join(map(str, cmd))}")
+            returncode, stderr = _run_streamed(cmd, timeout=300)
             
-            if result.returncode == 0:
+            if returncode == 0:
                 self.logger.info("Beets tagging successful")
                 
-                # Re-extract metadata after beets processing
-                updated_metadata = self.extract_metadata_from_files(book_path)
+                # Read back what beets matched; only re-parse the files if that fails
+                updated_metadata = self.read_beets_metadata(db_file, initial_metadata)
+                if not updated_metadata:
+                    updated_metadata = self.extract_metadata_from_files(book_path)
                 if updated_metadata:
                     self.logger.info(f"Updated metadata - Artist: {updated_metadata['artist']}, Title: {updated_metadata['title']}")
                     return updated_metadata
@@ -375,7 +708,7 @@ class AudiobookConverter:
                     self.logger.warning("Could not extract updated metadata, using initial")
                     return initial_metadata
             else:
-                self.logger.warning(f"Beets tagging failed: {result.stderr}")
+                self.logger.warning(f"Beets tagging failed: {stderr}")
                 return initial_metadata
                 
         except subprocess.TimeoutExpired:
@@ -385,82 +718,267 @@ class AudiobookConverter:
             self.logger.warning(f"Could not run beets: {str(e)}")
             return initial_metadata
         finally:
-            # Clean up temporary config and database
-            config_file.unlink(missing_ok=True)
-            db_file = self.temp_dir / f'beets_{book_path.name}.db'
-            db_file.unlink(missing_ok=True)
+            # Clean up temporary database and the <db>-before-*.bak migration backups beets writes next to it
+            _remove_prefixed(db_file)
     
-    def convert_to_m4b_ffmpeg712(self, book_path, metadata, output_filename):
-        """Convert audiobook to M4B using FFmpeg 7.1.2 with libfdk_aac"""
-        self.logger.info(f"Converting to M4B with FFmpeg 7.1.2: {book_path.name}")
+    def probe_audio_stream(self, audio_file):
+        """
+        Get codec name, sample rate and channel count of the first audio stream via ffprobe
+        Results are cached by path, mtime and size; returns None if probing fails
+        """
+        # Staged copies in the temp dir get a new path for every book run, never cache them
+        cacheable = self.temp_dir not in audio_file.parents
+        if cacheable:
+            file_stat = audio_file.stat()
+            stream_info = self.get_cached_metadata(audio_file, file_stat, table='stream_cache')
+            if stream_info:
+                return tuple(stream_info)
         
-        # Get all audio files sorted by name
-        audio_files = sorted(list(book_path.glob("*.mp3")) + list(book_path.glob("*.m4a")))
-        if not audio_files:
-            self.logger.error("No audio files found")
+        cmd = [
+            'ffprobe', '-v', 'error',
+            '-select_streams', 'a:0',
+            '-show_entries', 'stream=codec_name,sample_rate,channels',
+            '-of', 'json',
+            audio_file
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            streams = json.loads(result.stdout).get('streams') if result.returncode == 0 else None
+        except (subprocess.TimeoutExpired, ValueError) as e:
+            self.logger.warning(f"Could not probe {audio_file}: {e}")
+            return None
+        if not streams:
             return None
         
-        output_file = self.temp_dir / output_filename
-        
-        # Create file list for FFmpeg concat
-        file_list_path = self.temp_dir / f"{book_path.name}_files.txt"
-        with open(file_list_path, 'w') as f:
-            for audio_file in audio_files:
-                # Escape single quotes for ffmpeg
-                escaped_path = str(audio_file.absolute()).replace("'", "'\"'\"'")
-                f.write(f"file '{escaped_path}'\n")
+        stream = streams[0]
+        stream_info = (stream.get('codec_name'), stream.get('sample_rate'), stream.get('channels'))
+        if cacheable:
+            self.store_cached_metadata(audio_file, file_stat, stream_info, table='stream_cache')
+        return stream_info
+    
+    def can_stream_copy(self, audio_files):
+        """Check if all files are AAC with the same sample rate and channels, so they can be remuxed as-is"""
+        # MP3 input always needs encoding, don't bother probing it
+        if not all(audio_file.suffix.lower() == '.m4a' for audio_file in audio_files):
+            return False
         
-        # FFmpeg 7.1.2 command with libfdk_aac and enhanced quality options
+        first_info = self.probe_audio_stream(audio_files[0])
+        if not first_info or first_info[0] != 'aac':
+            return False
+        return all(self.probe_audio_stream(audio_file) == first_info for audio_file in audio_files[1:])
+    
+    def extract_embedded_cover(self, audio_file, cover_path):
+        """
+        Copy the picture embedded in an audio file (e.g. an ID3 APIC frame) to cover_path
+        The picture stream is copied, not decoded; returns cover_path or None if there is no picture
+        """
         cmd = [
-            'ffmpeg', '-y',
-            '-f', 'concat',
-            '-safe', '0',
-            '-i', str(file_list_path),
-            '-c:a', self.config['conversion']['audio_codec'],
-            '-b:a', self.config['conversion']['audio_bitrate'],
-            '-movflags', '+faststart',
-            '-metadata', f"title={metadata['title']}",
-            '-metadata', f"artist={metadata['artist']}",
-            '-metadata', f"album={metadata.get('album', metadata['title'])}",
+            'ffmpeg', '-y', '-v', 'error',
+            '-i', audio_file,
+            '-an',
+            '-map', '0:v:0?',
+            '-c:v', 'copy',
+            '-frames:v', '1',
+            cover_path
         ]
+        try:
+            subprocess.run(cmd, capture_output=True, timeout=60)
+        except subprocess.TimeoutExpired:
+            self.logger.warning(f"Timed out extracting cover art from {audio_file}")
         
-        # Add year if available
-        if metadata.get('year'):
-            cmd.extend(['-metadata', f"year={metadata['year']}"])
+        if cover_path.exists() and cover_path.stat().st_size > 0:
+            return cover_path
+        cover_path.unlink(missing_ok=True)
+        return None
+    
+    def find_cover_file(self, book_path):
+        """
+        Find the cover image of a book in a single directory pass
+        Preference: cover.*, folder.*, *.jpg, *.png
+        """
+        no_match = len(COVER_RANKS)
+        best = None
+        best_rank = no_match
+        with os.scandir(book_path) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                stem, _, suffix = entry.name.rpartition('.')
+                rank = COVER_RANKS.get(stem, COVER_RANKS.get(f".{suffix}", no_match))
+                if rank == no_match:
+                    continue
+                if rank < best_rank or (rank == best_rank and entry.name < best.name):
+                    best = Path(entry.path)
+                    best_rank = rank
+        return best
+    
+    def write_concat_list(self, file_list_path, audio_files):
+        """Write a file list for the FFmpeg concat demuxer"""
+        with open(file_list_path, 'wb') as f:
+            for audio_file in audio_files:
+                # Escape single quotes for ffmpeg: close quote, escaped quote, reopen
+                escaped_path = os.fsencode(os.path.abspath(audio_file)).replace(b"'", b"'\\''")
+                f.write(b"file '" + escaped_path + b"'\n")
+    
+    def cpu_budget(self):
+        """
+        Cores available to one book: the configured jobs (capped at the host's cores)
+        shared between the books that may be converting at the same time
+        """
+        cores = min(self.config['conversion']['jobs'], os.cpu_count() or 1)
+        return max(1, cores // self.config['performance']['parallel_books'])
+    
+    def encode_shards(self, audio_files, encode_args, work_dir):
+        """
+        Split the tracks into one contiguous shard per available core and encode the shards concurrently
+        libfdk_aac is single-threaded, so this spreads one book's encode over its CPU budget
+        Returns the encoded part files in order, or None if sharding is not used or fails
+        """
+        shard_count = min(self.cpu_budget(), len(audio_files))
+        if shard_count < 2:
+            return None
         
-        # Quality profile specific options for FFmpeg 7.1.2
-        if self.config['conversion']['quality_profile'] == 'high':
-            cmd.extend([
-                '-afterburner', '1',
-                '-cutoff', '20000',
-                '-profile:a', 'aac_he_v2'
-            ])
-        elif self.config['conversion']['quality_profile'] == 'medium':
-            cmd.extend(['-cutoff', '15000'])
+        shard_size = -(-len(audio_files) // shard_count)
+        shards = [audio_files[i:i + shard_size] for i in range(0, len(audio_files), shard_size)]
+        self.logger.info(f"Encoding {len(audio_files)} files in {len(shards)} parallel shards")
+        
+        part_files = []
+        running = []
+        try:
+            for i, shard in enumerate(shards):
+                shard_list_path = work_dir / f"part_{i}.txt"
+                part_file = work_dir / f"part_{i}.m4a"
+                self.write_concat_list(shard_list_path, shard)
+                part_files.append(part_file)
+                
+                cmd = [
+                    'ffmpeg', '-y', '-v', 'error', '-nostats',
+                    '-f', 'concat',
+                    '-safe', '0',
+                    '-i', shard_list_path,
+                    '-vn',
+                    '-threads', '1',
+                    *encode_args,
+                    part_file
+                ]
+                running.append(_start_streamed(cmd))
+            
+            # One deadline shared by all shards, like the single-pass encode
+            deadline = time.monotonic() + 3600
+            failed = False
+            for process, reader, tail in running:
+                returncode, stderr = _wait_streamed(process, reader, tail, max(0, deadline - time.monotonic()))
+                if returncode != 0:
+                    self.logger.error(f"FFmpeg shard encode failed: {stderr}")
+                    failed = True
+            
+            if not failed:
+                return part_files
+        except subprocess.TimeoutExpired:
+            self.logger.error("FFmpeg shard encode timed out")
+        finally:
+            for process, _, _ in running:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+        
+        for part_file in part_files:
+            part_file.unlink(missing_ok=True)
+        return None
+    
+    def convert_to_m4b_ffmpeg712(self, book_path, metadata, output_filename, work_dir):
+        """
+        Convert audiobook to M4B using FFmpeg 7.1.2 with libfdk_aac
+        Intermediate files and the resulting M4B are written to the book's work_dir
+        """
+        self.logger.info(f"Converting to M4B with FFmpeg 7.1.2: {book_path.name}")
         
-        # Add cover art if available
-        cover_files = (list(book_path.glob("cover.*")) + 
-                      list(book_path.glob("folder.*")) + 
-                      list(book_path.glob("*.jpg")) + 
-                      list(book_path.glob("*.png")))
-        if cover_files:
-            cmd.extend(['-i', str(cover_files[0]), '-c:v', 'copy', '-disposition:v', 'attached_pic'])
+        # Get all audio files sorted by name
+        audio_files = self.find_audio_files(book_path)
+        if not audio_files:
+            self.logger.error("No audio files found")
+            return None
         
-        cmd.append(str(output_file))
+        part_files = []
+        output_file = work_dir / output_filename
+        file_list_path = work_dir / "files.txt"
+        embedded_cover_path = work_dir / "cover.jpg"
         
         try:
-            self.logger.info(f"Running FFmpeg 7.1.2 command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)
+            # Create file list for FFmpeg concat
+            self.write_concat_list(file_list_path, audio_files)
             
-            if result.returncode == 0 and output_file.exists():
-                self.logger.info("M4B conversion successful with FFmpeg 7.1.2")
+            # Cover art: picture embedded in the first track, else an image file in the book directory
+            cover_file = self.extract_embedded_cover(audio_files[0], embedded_cover_path) or self.find_cover_file(book_path)
+            
+            # FFmpeg 7.1.2 command with libfdk_aac and enhanced quality options
+            cmd = [
+                'ffmpeg', '-y',
+                '-f', 'concat',
+                '-safe', '0',
+                '-i', file_list_path,
+            ]
+            
+            # Add cover art if available
+            if cover_file:
+                cmd.extend([
+                    '-i', cover_file,
+                    '-map', '0:a', '-map', '1:v',
+                    '-c:v', 'copy', '-threads:v', '1', '-disposition:v', 'attached_pic'
+                ])
+            else:
+                cmd.extend(['-map', '0:a'])
+            
+            cmd.extend([
+                '-threads', str(self.cpu_budget()),
+                '-movflags', '+faststart',
+                '-metadata', f"title={metadata['title']}",
+                '-metadata', f"artist={metadata['artist']}",
+                '-metadata', f"album={metadata.get('album', metadata['title'])}",
+            ])
+            
+            # Add year if available
+            if metadata.get('year'):
+                cmd.extend(['-metadata', f"year={metadata['year']}"])
+            
+            if self.can_stream_copy(audio_files):
+                # Input is already AAC, remux without a lossy re-encode
+                self.logger.info("All input files are AAC with matching format, copying audio stream")
+                cmd.extend(['-c:a', 'copy'])
+            else:
+                encode_args = [
+                    '-c:a', self.config['conversion']['audio_codec'],
+                    '-b:a', self.config['conversion']['audio_bitrate']
+                ]
                 
-                # Clean up
-                file_list_path.unlink(missing_ok=True)
+                # Quality profile specific options for FFmpeg 7.1.2
+                if self.config['conversion']['quality_profile'] == 'high':
+                    encode_args.extend([
+                        '-afterburner', '1',
+                        '-cutoff', '20000',
+                        '-profile:a', 'aac_he_v2'
+                    ])
+                elif self.config['conversion']['quality_profile'] == 'medium':
+                    encode_args.extend(['-cutoff', '15000'])
                 
+                # Encode shards of the book in parallel and remux the parts losslessly
+                part_files = self.encode_shards(audio_files, encode_args, work_dir) or []
+                if part_files:
+                    self.write_concat_list(file_list_path, part_files)
+                    cmd.extend(['-c:a', 'copy'])
+                else:
+                    cmd.extend(encode_args)
+            
+            cmd.append(output_file)
+            
+            self.logger.info(f"Running FFmpeg 7.1.2 command: {' '.join(map(str, cmd))}")
+            returncode, stderr = _run_streamed(cmd, timeout=3600)
+            
+            if returncode == 0 and output_file.exists():
+                self.logger.info("M4B conversion successful with FFmpeg 7.1.2")
                 return output_file
             else:
-                self.logger.error(f"FFmpeg conversion failed: {result.stderr}")
+                self.logger.error(f"FFmpeg conversion failed: {stderr}")
                 return None
                 
         except subprocess.TimeoutExpired:
@@ -469,22 +987,110 @@ class AudiobookConverter:
         except Exception as e:
             self.logger.error(f"Error running FFmpeg 7.1.2: {str(e)}")
             return None
+        finally:
+            for part_file in part_files:
+                part_file.unlink(missing_ok=True)
+            file_list_path.unlink(missing_ok=True)
+            embedded_cover_path.unlink(missing_ok=True)
 
 class AudiobookHandler(FileSystemEventHandler):
-    """File system event handler for watching input directory"""
+    """
+    File system event handler for watching input directory
+    A book is processed once its directory has seen no writes for settle_time seconds,
+    so multi-file copies are debounced without a fixed sleep per event
+    """
     
     def __init__(self, converter):
         self.converter = converter
+        self.settle_time = converter.config['monitoring']['settle_time']
+        self.lock = threading.Lock()
+        self.timers = {}
+        self.last_activity = {}
+        self.in_flight = set()
+        self.stopped = False
     
     def on_created(self, event):
-        if event.is_directory:
-            # Wait for file copying to complete
-            time.sleep(10)
-            book_path = Path(event.src_path)
-            audio_files = list(book_path.glob("*.mp3")) + list(book_path.glob("*.m4a"))
-            if audio_files:
-                self.converter.logger.info(f"New audiobook detected: {book_path}")
-                self.converter.process_audiobook(book_path)
+        self.touch(event)
+    
+    def on_modified(self, event):
+        self.touch(event)
+    
+    def on_closed(self, event):
+        # inotify IN_CLOSE_WRITE: a writer finished a file
+        self.touch(event)
+    
+    def touch(self, event):
+        """Record activity in the book directory an event belongs to"""
+        book_path = Path(event.src_path)
+        if not event.is_directory:
+            book_path = book_path.parent
+        if not self.is_book_path(book_path):
+            return
+        
+        with self.lock:
+            if self.stopped:
+                return
+            self.last_activity[book_path] = time.monotonic()
+            if book_path not in self.timers:
+                self.start_timer(book_path, self.settle_time)
+    
+    def is_book_path(self, book_path):
+        """Only directories below the input dir are books; never the input dir itself"""
+        return self.converter.input_dir in book_path.parents
+    
+    def start_timer(self, book_path, delay):
+        """Check the book directory again after delay seconds"""
+        timer = threading.Timer(delay, self.settled, args=(book_path,))
+        timer.daemon = True
+        self.timers[book_path] = timer
+        timer.start()
+    
+    def settled(self, book_path):
+        """Submit the book for processing if it has been quiet for settle_time seconds"""
+        with self.lock:
+            if self.stopped:
+                return
+            remaining = self.last_activity[book_path] + self.settle_time - time.monotonic()
+            if remaining > 0:
+                self.start_timer(book_path, remaining)
+                return
+            del self.timers[book_path]
+            del self.last_activity[book_path]
+        
+        # process_audiobook removes the book directory, so never hand it the input root
+        if not self.is_book_path(book_path):
+            return
+        
+        try:
+            has_audio = book_path.is_dir() and self.converter.find_audio_files(book_path)
+        except OSError:
+            # Directory was removed or renamed while settling
+            return
+        if not has_audio:
+            return
+        
+        with self.lock:
+            # Never convert the same book twice at once
+            if self.stopped or book_path in self.in_flight:
+                return
+            self.in_flight.add(book_path)
+            self.converter.logger.info(f"New audiobook detected: {book_path}")
+            future = self.converter.executor.submit(self.converter.process_audiobook, book_path)
+        future.add_done_callback(lambda _: self.finished(book_path))
+    
+    def finished(self, book_path):
+        """Allow a book to be submitted again once its conversion is done"""
+        with self.lock:
+            self.in_flight.discard(book_path)
+    
+    def stop(self):
+        """Cancel pending settle timers so nothing is submitted once shutdown starts"""
+        with self.lock:
+            self.stopped = True
+            for timer in self.timers.values():
+                timer.cancel()
+            self.timers.clear()
+            self.last_activity.clear()
 
 def main():
     """Main application entry point"""
@@ -501,14 +1107,19 @@ def main():
     
     converter.logger.info("Audiobook converter started with FFmpeg 7.1.2. Watching for new files...")
     
+    # Stop watching on container shutdown; join() blocks without waking up periodically
+    signal.signal(signal.SIGTERM, lambda *_: observer.stop())
+    
     try:
-        while True:
-            time.sleep(60)  # Health check every minute
+        observer.join()
     except KeyboardInterrupt:
         observer.stop()
-        converter.logger.info("Shutting down gracefully...")
+        observer.join()
     
-    observer.join()
+    converter.logger.info("Shutting down gracefully...")
+    event_handler.stop()
+    # Finish the books already converting, drop the ones still queued
+    converter.executor.shutdown(wait=True, cancel_futures=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file